@@ -1,7 +1,37 @@
 import argparse
-import json
+import orjson
 from parser.parse_pdf import parse_pdf
 
+# Below this many articles the one-shot pretty dump is fine; above it the
+# serialized document is large enough to be worth streaming section by section
+STREAM_MIN_ARTICLES = 200
+
+
+def write_result_json(result, output_path):
+    """
+    Write the parsed result to a JSON file. Large documents are streamed one
+    section at a time so the full serialized output never has to sit in
+    memory next to the result dict; small ones get a pretty-printed one-shot
+    dump.
+    """
+    sections = result.get('sections', [])
+    num_articles = sum(len(s.get('articles', [])) for s in sections)
+    if num_articles < STREAM_MIN_ARTICLES:
+        with open(output_path, 'wb') as f:
+            f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+        return
+    header = {k: v for k, v in result.items() if k != 'sections'}
+    with open(output_path, 'wb') as f:
+        f.write(b'{\n')
+        for key, value in header.items():
+            f.write(b'  ' + orjson.dumps(key) + b': ' + orjson.dumps(value) + b',\n')
+        f.write(b'  "sections": [\n')
+        for i, section in enumerate(sections):
+            if i:
+                f.write(b',\n')
+            f.write(orjson.dumps(section))
+        f.write(b'\n  ]\n}\n')
+
 
 def main():
     parser = argparse.ArgumentParser(description='PDF-to-JSON Legal Document Parser')
@@ -11,11 +41,10 @@ def main():
 
     try:
         result = parse_pdf(args.pdf_path)
-        with open(args.output_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        write_result_json(result, args.output_path)
         print(f'Parsing {args.pdf_path} and saving to {args.output_path}')
     except Exception as e:
         print(f'Error: {e}')
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -1,26 +1,56 @@
 import os
 import requests
-import json
 from dotenv import load_dotenv
 import re
+import asyncio
+import hashlib
 import logging
 import datetime
+import time
 import os as _os
 
+import aiohttp
+import diskcache
+import orjson
+
 load_dotenv()
 
 OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
 OPENROUTER_API_URL = 'https://openrouter.ai/api/v1/chat/completions'
 MODEL = 'mistralai/mistral-7b-instruct'
+TEMPERATURE = 0.2
+
+# Maximum number of LLM requests in flight at once (async path)
+MAX_CONCURRENT_LLM_CALLS = 10
+
+# Completion budget per article in a batch request (summary + intention +
+# keywords comfortably fit; the old flat 1024 allowed ~5 articles)
+COMPLETION_TOKENS_PER_ARTICLE = 200
+
+# Conservative submission limits for the async path; tune to your OpenRouter plan
+REQUESTS_PER_MINUTE = 60
+TOKENS_PER_MINUTE = 100_000
 
 # Set DEV_MODE to True to save LLM responses to disk (llm_responses directory)
 DEV_MODE = False
 
+# On-disk cache of parsed LLM responses, keyed by a content hash of the
+# request, so identical article text never triggers a second paid API call
+LLM_CACHE_DIR = '.llm_cache'
+_llm_cache = diskcache.Cache(LLM_CACHE_DIR)
+
 HEADERS = {
     'Authorization': f'Bearer {OPENROUTER_API_KEY}',
     'Content-Type': 'application/json',
 }
 
+# Shared session for the sync path: keep-alive reuses the TCP+TLS connection
+# across calls instead of paying the handshake per request
+_session = requests.Session()
+_session.headers.update(HEADERS)
+
+REQUEST_TIMEOUT = 60
+
 logger = logging.getLogger(__name__)
 
 def _save_llm_response(raw_content: str, identifier: str):
@@ -36,93 +66,359 @@ def _save_llm_response(raw_content: str, identifier: str):
     logger.info(f"Saved LLM response to {file_path}")
 
 
-def analyze_articles_batch_with_mistral(article_texts: list) -> list:
+class TokenBucketRateLimiter:
     """
-    Calls Mistral 7B via OpenRouter to summarize, generate intention, and keywords for a batch of articles.
-    Returns a list of dicts with 'summary', 'intention', and 'keywords' for each article.
+    Proactive rate limiter for concurrent LLM calls. Tracks request and token
+    capacity, replenished continuously at RPM/60 and TPM/60 per second, so
+    submissions stay just under the provider limits instead of bouncing off
+    429 responses and paying retry backoff. A 429 halves the rates anyway as
+    a safety valve.
     """
-    numbered_articles = "\n".join([f"Artikel {i+1}:\n{txt}" for i, txt in enumerate(article_texts)])
-    prompt = f"""
+
+    # Don't throttle below this TPM: a single max-size batch request is
+    # estimated around 10k tokens, and the limiter deadlocks if the bucket
+    # can never hold one request
+    TOKENS_PER_MINUTE_FLOOR = 20_000
+    # Seconds during which further throttle() calls are ignored
+    THROTTLE_COOLDOWN = 10.0
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_capacity = requests_per_minute
+        self._token_capacity = tokens_per_minute
+        self._last_refill = time.monotonic()
+        self._last_throttle = -self.THROTTLE_COOLDOWN
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._request_capacity = min(
+            self.requests_per_minute,
+            self._request_capacity + elapsed * self.requests_per_minute / 60)
+        self._token_capacity = min(
+            self.tokens_per_minute,
+            self._token_capacity + elapsed * self.tokens_per_minute / 60)
+
+    async def acquire(self, estimated_tokens: int):
+        """Wait until there is capacity for one request of estimated_tokens."""
+        while True:
+            async with self._lock:
+                self._refill()
+                # A request estimated above the full bucket could otherwise
+                # never be satisfied; clamp so it waits for a full bucket at
+                # most. Re-read each iteration because throttle() can shrink
+                # the bucket while we wait.
+                needed = min(estimated_tokens, self.tokens_per_minute)
+                if self._request_capacity >= 1 and self._token_capacity >= needed:
+                    self._request_capacity -= 1
+                    self._token_capacity -= needed
+                    return
+            await asyncio.sleep(0.1)
+
+    def throttle(self):
+        """
+        Halve the submission rate after a 429 response. Concurrent calls tend
+        to hit 429 together, so only the first throttle within the cooldown
+        window takes effect; otherwise ten in-flight requests would collapse
+        the rate by 2^10 at once.
+        """
+        now = time.monotonic()
+        if now - self._last_throttle < self.THROTTLE_COOLDOWN:
+            return
+        self._last_throttle = now
+        self.requests_per_minute = max(1, self.requests_per_minute / 2)
+        self.tokens_per_minute = max(self.TOKENS_PER_MINUTE_FLOOR,
+                                     self.tokens_per_minute / 2)
+        logger.warning(
+            f"Rate limited by API, throttling to {self.requests_per_minute:.0f} RPM / "
+            f"{self.tokens_per_minute:.0f} TPM")
+
+
+_rate_limiter = TokenBucketRateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+
+
+def _estimate_request_tokens(data: dict) -> int:
+    """Estimate prompt + completion tokens for a request payload (~4 chars/token)."""
+    prompt_chars = sum(len(m['content']) for m in data['messages'])
+    return prompt_chars // 4 + data.get('max_tokens', 0)
+
+
+async def warm_connection(session: aiohttp.ClientSession):
+    """
+    Pre-establish the TCP+TLS connection to the API host so the first real
+    LLM call skips the handshake. Best-effort: failures are ignored.
+    """
+    base_url = OPENROUTER_API_URL.split('/api', 1)[0]
+    try:
+        async with session.get(base_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+            await response.read()
+    except Exception:
+        pass
+
+
+def _cache_key(kind: str, system_prompt: str, texts: list) -> str:
+    """
+    Content hash identifying one LLM request. The request kind and system
+    prompt are part of the key so a document analysis and a one-article batch
+    over the same text never collide, and prompt changes invalidate stale
+    cached responses.
+    """
+    payload = orjson.dumps([kind, system_prompt, MODEL, TEMPERATURE, texts],
+                           option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _dedupe_texts(article_texts: list) -> tuple:
+    """
+    Collapse duplicate texts inside a batch (e.g. repeated boilerplate clauses).
+    Returns (unique_texts, index_map) where index_map[i] is the position of
+    article_texts[i] in unique_texts.
+    """
+    unique_texts = []
+    seen = {}
+    index_map = []
+    for text in article_texts:
+        if text not in seen:
+            seen[text] = len(unique_texts)
+            unique_texts.append(text)
+        index_map.append(seen[text])
+    return unique_texts, index_map
+
+
+def _expand_results(results: list, index_map: list) -> list:
+    """Re-expand per-unique-text results back to the original batch positions."""
+    empty = {"summary": "", "intention": "", "keywords": ""}
+    return [results[idx] if idx < len(results) else dict(empty) for idx in index_map]
+
+
+def _cacheable_batch_result(results: list) -> bool:
+    """Only cache cleanly parsed batch results, not error or raw fallbacks."""
+    return all(isinstance(x, dict) and 'error' not in x and 'raw' not in x for x in results)
+
+
+# Fixed instruction blocks, sent as system messages so they are byte-identical
+# across requests and eligible for provider-side prompt caching
+BATCH_SYSTEM_PROMPT = """
     Analysiere die folgenden rechtlichen Artikel. Gib ein JSON-Array zurück, wobei jedes Element folgende Felder enthält:
     - summary: eine prägnante Zusammenfassung auf Deutsch (genau ein Satz, nicht mit 'Dieser Artikel regelt', 'Dieser Artikel beschreibt', 'Dieser Artikel handelt von' oder ähnlichen generischen Phrasen beginnen, sondern direkt mit dem Inhalt starten)
     - intention: der Zweck oder das Ziel des Artikels auf Deutsch (genau ein Satz, nicht mit 'Dieser Artikel regelt', 'Dieser Artikel beschreibt', 'Dieser Artikel handelt von' oder ähnlichen generischen Phrasen beginnen, sondern klar und spezifisch den Zweck oder das Ziel benennen, nicht nur den Inhalt wiederholen oder allgemein beschreiben. Z.B. 'Schutz der Angestellten vor ungerechtfertigter Kündigung.')
     - keywords: 3-6 relevante Stichwörter auf Deutsch, kommasepariert
     Die Reihenfolge im Array muss der Reihenfolge der Artikel entsprechen.
-    {numbered_articles}
     """
-    data = {
+
+DOCUMENT_SYSTEM_PROMPT = """
+    Analyze the following legal document as a whole. Return a JSON object with:
+    - title: a suitable, concise document title in German
+    - summary: a concise summary in German (exactly one sentence, do not start with 'Dieses Dokument regelt', 'Dieses Dokument beschreibt', 'Dieses Dokument handelt von' or similar generic phrases, but start directly with the content)
+    - intention: the purpose or goal of the document in German (exactly one sentence, do not start with 'Dieses Dokument regelt', 'Dieses Dokument beschreibt', 'Dieses Dokument handelt von' or similar generic phrases, but clearly and specifically state the purpose or goal, not just repeat or generally describe the content. E.g., 'Schaffung klarer Rahmenbedingungen für das Gemeindepersonal.')
+    - keywords: 3-6 relevant keywords in German, comma-separated
+    """
+
+
+def _build_batch_request_data(article_texts: list) -> dict:
+    """Build the OpenRouter request payload for a batch of articles."""
+    numbered_articles = "\n".join([f"Artikel {i+1}:\n{txt}" for i, txt in enumerate(article_texts)])
+    return {
         "model": MODEL,
         "messages": [
-            {"role": "user", "content": prompt}
+            {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": numbered_articles}
         ],
-        "max_tokens": 1024,
-        "temperature": 0.2
+        # One summary/intention/keywords triple per article; the budget has to
+        # grow with the batch or large batches get truncated mid-array
+        "max_tokens": max(1024, COMPLETION_TOKENS_PER_ARTICLE * len(article_texts)),
+        "temperature": TEMPERATURE
+    }
+
+
+def _build_document_request_data(document_text: str) -> dict:
+    """Build the OpenRouter request payload for a whole-document analysis."""
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": DOCUMENT_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Document:\n{document_text}"}
+        ],
+        "max_tokens": 512,
+        "temperature": TEMPERATURE
     }
+
+
+def _consume_stream(response) -> str:
+    """
+    Accumulate the content deltas of an SSE streaming response into the full
+    completion text. Tokens are consumed as they arrive, so decoding overlaps
+    with generation instead of waiting for the whole completion.
+    """
+    parts = []
+    for line in response.iter_lines():
+        if not line or not line.startswith(b'data: '):
+            continue
+        payload = line[len(b'data: '):]
+        if payload == b'[DONE]':
+            break
+        try:
+            delta = orjson.loads(payload)
+        except Exception:
+            continue
+        choices = delta.get('choices') or []
+        if choices:
+            part = choices[0].get('delta', {}).get('content')
+            if part:
+                parts.append(part)
+    return ''.join(parts)
+
+
+def _parse_batch_content(content: str, num_articles: int) -> list:
+    """Parse the LLM response for a batch of articles into a list of dicts."""
+    # Remove code block markers if present
+    content = re.sub(r'^```json|^```python|^```', '', content.strip(), flags=re.IGNORECASE)
+    content = re.sub(r'```$', '', content.strip(), flags=re.IGNORECASE)
+    content = content.strip()
+    try:
+        parsed = orjson.loads(content)
+        if isinstance(parsed, list) and all(isinstance(x, dict) for x in parsed):
+            return parsed
+        if isinstance(parsed, list) and all(isinstance(x, str) for x in parsed):
+            out = []
+            for x in parsed:
+                try:
+                    out.append(orjson.loads(x))
+                except Exception:
+                    logger.warning(f"Failed to parse JSON from LLM batch element: {x}")
+                    out.append({"summary": "", "intention": "", "keywords": "", "raw": x})
+            return out
+        if isinstance(parsed, dict):
+            return [parsed]
+    except Exception:
+        logger.warning(f"Failed to parse JSON from LLM batch response: {content}")
+    return [{"summary": "", "intention": "", "keywords": "", "raw": content}] * num_articles
+
+
+def _parse_document_content(content: str) -> dict:
+    """Parse the LLM response for a whole-document analysis into a dict."""
+    try:
+        return orjson.loads(content)
+    except Exception:
+        logger.warning(f"Failed to parse JSON from LLM document response: {content}")
+        return {"summary": "", "intention": "", "keywords": "", "title": "", "raw": content}
+
+
+async def _post_chat_completion(session: aiohttp.ClientSession, data: dict) -> str:
+    """
+    POST a chat-completion payload through the rate limiter and return the
+    message content. A 429 throttles the limiter and is retried once after
+    re-acquiring capacity at the reduced rate; a second 429 propagates.
+    """
+    for attempt in range(2):
+        await _rate_limiter.acquire(_estimate_request_tokens(data))
+        async with session.post(OPENROUTER_API_URL, headers=HEADERS, json=data) as response:
+            if response.status == 429:
+                _rate_limiter.throttle()
+                if attempt == 0:
+                    continue
+            response.raise_for_status()
+            result = orjson.loads(await response.read())
+        return result['choices'][0]['message']['content']
+
+
+def analyze_articles_batch_with_mistral(article_texts: list) -> list:
+    """
+    Calls Mistral 7B via OpenRouter to summarize, generate intention, and keywords for a batch of articles.
+    Returns a list of dicts with 'summary', 'intention', and 'keywords' for each article.
+    """
+    unique_texts, index_map = _dedupe_texts(article_texts)
+    key = _cache_key('batch', BATCH_SYSTEM_PROMPT, unique_texts)
+    cached = _llm_cache.get(key)
+    if cached is not None:
+        logger.info("LLM cache hit for article batch")
+        return _expand_results(cached, index_map)
+    data = _build_batch_request_data(unique_texts)
+    data['stream'] = True
     try:
-        response = requests.post(OPENROUTER_API_URL, headers=HEADERS, json=data)
+        response = _session.post(OPENROUTER_API_URL, json=data, stream=True, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        result = response.json()
-        content = result['choices'][0]['message']['content']
+        content = _consume_stream(response)
         _save_llm_response(content, 'batch')
-        # Remove code block markers if present
-        content = re.sub(r'^```json|^```python|^```', '', content.strip(), flags=re.IGNORECASE)
-        content = re.sub(r'```$', '', content.strip(), flags=re.IGNORECASE)
-        content = content.strip()
-        try:
-            parsed = json.loads(content)
-            if isinstance(parsed, list) and all(isinstance(x, dict) for x in parsed):
-                return parsed
-            if isinstance(parsed, list) and all(isinstance(x, str) for x in parsed):
-                out = []
-                for x in parsed:
-                    try:
-                        out.append(json.loads(x))
-                    except Exception:
-                        logger.warning(f"Failed to parse JSON from LLM batch element: {x}")
-                        out.append({"summary": "", "intention": "", "keywords": "", "raw": x})
-                return out
-            if isinstance(parsed, dict):
-                return [parsed]
-        except Exception:
-            logger.warning(f"Failed to parse JSON from LLM batch response: {content}")
-        return [{"summary": "", "intention": "", "keywords": "", "raw": content}] * len(article_texts)
+        parsed = _parse_batch_content(content, len(unique_texts))
+        if _cacheable_batch_result(parsed):
+            _llm_cache.set(key, parsed)
+        return _expand_results(parsed, index_map)
     except Exception as e:
         logger.error(f"API error in analyze_articles_batch_with_mistral: {e}\nRequest data: {data}")
         return [{"summary": "", "intention": "", "keywords": "", "error": str(e)}] * len(article_texts)
 
+
+async def analyze_articles_batch_with_mistral_async(session: aiohttp.ClientSession, article_texts: list) -> list:
+    """
+    Async variant of analyze_articles_batch_with_mistral using an aiohttp session,
+    so several batches can be in flight concurrently.
+    """
+    unique_texts, index_map = _dedupe_texts(article_texts)
+    key = _cache_key('batch', BATCH_SYSTEM_PROMPT, unique_texts)
+    cached = _llm_cache.get(key)
+    if cached is not None:
+        logger.info("LLM cache hit for article batch")
+        return _expand_results(cached, index_map)
+    data = _build_batch_request_data(unique_texts)
+    try:
+        content = await _post_chat_completion(session, data)
+        _save_llm_response(content, 'batch')
+        parsed = _parse_batch_content(content, len(unique_texts))
+        if _cacheable_batch_result(parsed):
+            _llm_cache.set(key, parsed)
+        return _expand_results(parsed, index_map)
+    except Exception as e:
+        logger.error(f"API error in analyze_articles_batch_with_mistral_async: {e}\nRequest data: {data}")
+        return [{"summary": "", "intention": "", "keywords": "", "error": str(e)}] * len(article_texts)
+
+
 def analyze_document_with_mistral(document_text: str) -> dict:
     """
     Calls Mistral 7B via OpenRouter to summarize, generate intention, keywords, and title for the entire document.
     Returns a dict with 'summary', 'intention', 'keywords', and 'title'.
     """
-    prompt = f"""
-    Analyze the following legal document as a whole. Return a JSON object with:
-    - title: a suitable, concise document title in German
-    - summary: a concise summary in German (exactly one sentence, do not start with 'Dieses Dokument regelt', 'Dieses Dokument beschreibt', 'Dieses Dokument handelt von' or similar generic phrases, but start directly with the content)
-    - intention: the purpose or goal of the document in German (exactly one sentence, do not start with 'Dieses Dokument regelt', 'Dieses Dokument beschreibt', 'Dieses Dokument handelt von' or similar generic phrases, but clearly and specifically state the purpose or goal, not just repeat or generally describe the content. E.g., 'Schaffung klarer Rahmenbedingungen für das Gemeindepersonal.')
-    - keywords: 3-6 relevant keywords in German, comma-separated
-    Document:
-    {document_text}
-    """
-    data = {
-        "model": MODEL,
-        "messages": [
-            {"role": "user", "content": prompt}
-        ],
-        "max_tokens": 512,
-        "temperature": 0.2
-    }
+    key = _cache_key('document', DOCUMENT_SYSTEM_PROMPT, [document_text])
+    cached = _llm_cache.get(key)
+    if cached is not None:
+        logger.info("LLM cache hit for document analysis")
+        return cached
+    data = _build_document_request_data(document_text)
     try:
-        response = requests.post(OPENROUTER_API_URL, headers=HEADERS, json=data)
+        response = _session.post(OPENROUTER_API_URL, json=data, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        result = response.json()
+        result = orjson.loads(response.content)
         content = result['choices'][0]['message']['content']
         _save_llm_response(content, 'document')
-        try:
-            return json.loads(content)
-        except Exception:
-            logger.warning(f"Failed to parse JSON from LLM document response: {content}")
-            return {"summary": "", "intention": "", "keywords": "", "title": "", "raw": content}
+        parsed = _parse_document_content(content)
+        if 'raw' not in parsed:
+            _llm_cache.set(key, parsed)
+        return parsed
     except Exception as e:
         logger.error(f"API error in analyze_document_with_mistral: {e}\nRequest data: {data}")
-        return {"summary": "", "intention": "", "keywords": "", "title": "", "error": str(e)} 
\ No newline at end of file
+        return {"summary": "", "intention": "", "keywords": "", "title": "", "error": str(e)}
+
+
+async def analyze_document_with_mistral_async(session: aiohttp.ClientSession, document_text: str) -> dict:
+    """
+    Async variant of analyze_document_with_mistral using an aiohttp session.
+    """
+    key = _cache_key('document', DOCUMENT_SYSTEM_PROMPT, [document_text])
+    cached = _llm_cache.get(key)
+    if cached is not None:
+        logger.info("LLM cache hit for document analysis")
+        return cached
+    data = _build_document_request_data(document_text)
+    try:
+        content = await _post_chat_completion(session, data)
+        _save_llm_response(content, 'document')
+        parsed = _parse_document_content(content)
+        if 'raw' not in parsed:
+            _llm_cache.set(key, parsed)
+        return parsed
+    except Exception as e:
+        logger.error(f"API error in analyze_document_with_mistral_async: {e}\nRequest data: {data}")
+        return {"summary": "", "intention": "", "keywords": "", "error": str(e)}
@@ -1,136 +1,265 @@
 from turtle import title
+import asyncio
+import datetime
 import fitz  # PyMuPDF
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
 from typing import List, Dict, Any
 import logging
+import aiohttp
+import numpy as np
 import parser.llm_openrouter as llm_openrouter
-from parser.llm_openrouter import analyze_articles_batch_with_mistral, analyze_document_with_mistral
+from parser.llm_openrouter import (
+    MAX_CONCURRENT_LLM_CALLS,
+    analyze_articles_batch_with_mistral_async,
+    analyze_document_with_mistral_async,
+    warm_connection,
+)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def extract_text_with_layout(pdf_path: str) -> List[Dict[str, Any]]:
+# Below this page count the process pool spawn overhead outweighs the speedup
+MIN_PAGES_FOR_PROCESS_POOL = 8
+
+# Rough prompt-token budget per batch request (~4 chars/token), leaving
+# headroom for the instruction preamble and the 1024-token completion
+PROMPT_TOKEN_BUDGET = 6000
+
+# Cap on articles per LLM batch, independent of the token budget: many short
+# articles in one request make the model likelier to drop or merge entries in
+# the returned JSON array, and the completion budget scales per article
+MAX_ARTICLES_PER_BATCH = 20
+
+# Articles shorter than this are summarized locally instead of via the LLM
+MIN_ARTICLE_LENGTH_FOR_LLM = 60
+# Transitional boilerplate articles common in Swiss legal documents
+BOILERPLATE_ARTICLE_RE = re.compile(r'^(Inkrafttreten|Aufhebung|Übergangsbestimmung)')
+
+
+@dataclass
+class Spans:
+    """
+    Struct-of-arrays container for the text spans of a document.
+    One Python dict per span costs ~500 bytes and constant GC pressure;
+    parallel arrays keep the coordinates at a few bytes per span and give
+    the section-splitting pass cache-friendly integer indexing.
+    """
+    text: List[str]            # span text, one entry per span
+    stripped: List[str]        # span text with surrounding whitespace removed
+    bbox: np.ndarray           # (N, 4) float32, [x0, y0, x1, y1]
+    page: np.ndarray           # (N,) int32
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+# Section numeral (e.g., 'I.', 'II.', 'III.', 'I', 'II', etc.)
+SECTION_NUMERAL_RE = re.compile(r'^[IVX]+\.?\s*$')
+# Sub-section marker: a single capital letter (e.g., 'A.')
+SUBSECTION_RE = re.compile(r'^[A-Z]\.?$')
+# All article heading variants in one alternation, matched once per block:
+# 'Article 1: Title', 'Art. 1: Title', '§ 1: Title', 'Section 1: Title', '1. Title'
+ARTICLE_RE = re.compile(
+    r'^(?:(?:Article|Section)\s+|Art\.\s*|§\s*)(?P<num>\d+)[:\s]*(?P<title>[^\n]*)'
+    r'|^(?P<num2>\d+)\.\s*(?P<title2>[^\n]*)',
+    re.IGNORECASE
+)
+# Lowercased keys so matched month names need no .capitalize() before lookup
+MONTHS_EN = {m.lower(): i for i, m in enumerate(['January','February','March','April','May','June','July','August','September','October','November','December'], 1)}
+MONTHS_DE = {m.lower(): i for i, m in enumerate(['Januar','Februar','März','April','Mai','Juni','Juli','August','September','Oktober','November','Dezember'], 1)}
+_MONTHS_EN_ALT = '|'.join(MONTHS_EN)
+_MONTHS_DE_ALT = '|'.join(MONTHS_DE)
+# All date formats in one alternation so each span is scanned exactly once:
+# dd/mm/yyyy, yyyy-mm-dd, 'March 12, 2023', 'März 12, 2023', '12. März 2023'
+DATE_RE = re.compile(
+    r'\b(?P<dmy_d>\d{1,2})[/-](?P<dmy_m>\d{1,2})[/-](?P<dmy_y>\d{2,4})\b'
+    r'|\b(?P<ymd_y>\d{4})[/-](?P<ymd_m>\d{1,2})[/-](?P<ymd_d>\d{1,2})\b'
+    rf'|\b(?P<en_month>{_MONTHS_EN_ALT})\s+(?P<en_d>\d{{1,2}}),?\s+(?P<en_y>\d{{4}})\b'
+    rf'|\b(?P<de_month>{_MONTHS_DE_ALT})\s+(?P<de_d>\d{{1,2}}),?\s+(?P<de_y>\d{{4}})\b'
+    rf'|\b(?P<de2_d>\d{{1,2}})\.\s*(?P<de2_month>{_MONTHS_DE_ALT})\s*(?P<de2_y>\d{{4}})\b',
+    re.IGNORECASE
+)
+# Text cleanup patterns, compiled once instead of per article
+HYPHEN_BREAK_RE = re.compile(r'-\s*\n?\s*([a-zA-ZäöüÄÖÜß])')
+TRAILING_PAGE_RE = re.compile(r'(?:Seite|Page)?\s*\d+\s*$', re.IGNORECASE)
+INLINE_PAGE_RE = re.compile(r'(?:^|[ ]{4,})(\d{1,3})(?=[ ]{4,}|$)')
+SECTION_MARKER_RE = re.compile(r'(\s{0,2}(?:[IVX]+\.|[A-Z]\.)\s*)')
+
+
+def _extract_page_blocks(pdf_path: str, page_num: int) -> tuple:
+    """
+    Extract the text spans of a single page as parallel lists
+    (texts, bboxes).
+    Opens the PDF itself so it can run in a worker process (only
+    pickle-safe primitives cross the process boundary).
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        page = doc.load_page(page_num)
+        # Get text blocks with positioning information; skip image extraction,
+        # only the text spans are used ("blocks" mode would be lighter still,
+        # but it merges whole blocks and loses the per-span x0 the
+        # column/section splitting depends on)
+        blocks = page.get_text("dict", flags=fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES)
+        texts = []
+        bboxes = []
+        for block in blocks.get("blocks", []):
+            if "lines" in block:  # Text block
+                for line in block["lines"]:
+                    for span in line["spans"]:
+                        texts.append(span['text'])
+                        bboxes.append(span['bbox'])  # [x0, y0, x1, y1]
+        return texts, bboxes
+    finally:
+        doc.close()
+
+
+def extract_text_with_layout(pdf_path: str) -> Spans:
     """
     Extract text from PDF with layout information using PyMuPDF.
-    
+    Pages are independent, so long documents are parsed in parallel
+    with a process pool; short ones stay in-process to avoid spawn overhead.
+
     Args:
         pdf_path: Path to the PDF file
-        
+
     Returns:
-        List of text blocks with positioning information
+        Spans container with per-span text and positioning arrays, in page order
     """
     try:
-        doc = fitz.open(pdf_path)
-        all_blocks = []
-        
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            # Get text blocks with positioning information
-            blocks = page.get_text("dict")
-            
-            for block in blocks.get("blocks", []):
-                if "lines" in block:  # Text block
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            all_blocks.append({
-                                'text': span['text'],
-                                'bbox': span['bbox'],  # [x0, y0, x1, y1]
-                                'page': page_num,
-                                'font': span.get('font', ''),
-                                'size': span.get('size', 0),
-                                'flags': span.get('flags', 0)  # bold, italic, etc.
-                            })
-            
-        doc.close()
-        return all_blocks
-        
+        with fitz.open(pdf_path) as doc:
+            num_pages = len(doc)
+        max_workers = min(os.cpu_count() or 1, 4)
+        if num_pages < MIN_PAGES_FOR_PROCESS_POOL or max_workers == 1:
+            pages = [_extract_page_blocks(pdf_path, n) for n in range(num_pages)]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                pages = list(executor.map(_extract_page_blocks, repeat(pdf_path), range(num_pages)))
+        all_texts = []
+        page_nums = []
+        all_bboxes = []
+        for page_num, (texts, bboxes) in enumerate(pages):
+            all_texts.extend(texts)
+            page_nums.extend([page_num] * len(texts))
+            all_bboxes.extend(bboxes)
+        return Spans(
+            text=all_texts,
+            stripped=[t.strip() for t in all_texts],
+            bbox=np.array(all_bboxes, dtype=np.float32).reshape(len(all_texts), 4),
+            page=np.array(page_nums, dtype=np.int32),
+        )
+
     except Exception as e:
         logger.error(f"Error extracting text with layout from PDF {pdf_path}: {e}")
         raise
 
 
-def find_column_separator(blocks: List[Dict[str, Any]]) -> float:
+def find_column_separator(spans: Spans) -> float:
     """
     Find the x-coordinate that separates left and right columns.
-    
+
     Args:
-        blocks: List of text blocks with positioning information
-        
+        spans: Extracted text spans with positioning information
+
     Returns:
         X-coordinate that separates columns
     """
-    if not blocks:
+    if len(spans) == 0:
         return 0
-    
-    # Get all x-coordinates where text starts
-    x_positions = []
-    for block in blocks:
-        if block['text'].strip():
-            x_positions.append(block['bbox'][0])  # x0 coordinate
-    
-    if not x_positions:
+
+    # Get all x-coordinates where text starts (x0 of each non-empty span)
+    nonempty = np.fromiter((bool(t) for t in spans.stripped), dtype=bool, count=len(spans))
+    xs = spans.bbox[nonempty, 0].astype(np.float64)
+
+    if xs.size == 0:
         return 0
-    
-    # Find the most common gap between text positions
-    x_positions.sort()
-    gaps = []
-    for i in range(1, len(x_positions)):
-        gap = x_positions[i] - x_positions[i-1]
-        if gap > 20:  # Minimum gap threshold
-            gaps.append((x_positions[i-1], x_positions[i], gap))
-    
-    if gaps:
-        # Find the largest gap
-        largest_gap = max(gaps, key=lambda x: x[2])
-        # Return the midpoint of the largest gap
-        return (largest_gap[0] + largest_gap[1]) / 2
-    
+
+    xs.sort()
+    gaps = np.diff(xs)
+    mask = gaps > 20  # Minimum gap threshold
+    if mask.any():
+        # Return the midpoint of the largest qualifying gap
+        i = int(np.argmax(np.where(mask, gaps, -1)))
+        return float((xs[i] + xs[i + 1]) / 2)
+
     # Fallback: use median position
-    return sorted(x_positions)[len(x_positions)//2]
+    return float(xs[xs.size // 2])
+
+
+# Span classes for the section/article state machine
+SPAN_EMPTY = 0
+SPAN_NUMERAL = 1
+SPAN_ARTICLE = 2
+SPAN_TEXT = 3
 
 
-def split_into_sections_and_articles_with_layout(blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def _classify_spans(spans: Spans) -> tuple:
     """
-    Split text blocks into sections and group articles under each section based on layout and patterns.
-    Handles cases where the section numeral and title are in separate blocks.
+    Run the compiled detection regexes over all spans in one pass.
+    Returns (classes, matches): a uint8 class per span plus the ARTICLE_RE
+    match object for spans classified as article headings. The state machine
+    in split_into_sections_and_articles_with_layout then branches on plain
+    integers instead of re-running regexes per span.
+    """
+    n = len(spans)
+    classes = np.empty(n, dtype=np.uint8)
+    matches = [None] * n
+    numeral_match = SECTION_NUMERAL_RE.match
+    article_match = ARTICLE_RE.match
+    for i, text in enumerate(spans.stripped):
+        if not text:
+            classes[i] = SPAN_EMPTY
+        elif numeral_match(text):
+            classes[i] = SPAN_NUMERAL
+        else:
+            m = article_match(text)
+            if m:
+                classes[i] = SPAN_ARTICLE
+                matches[i] = m
+            else:
+                classes[i] = SPAN_TEXT
+    return classes, matches
+
+
+def split_into_sections_and_articles_with_layout(spans: Spans) -> List[Dict[str, Any]]:
+    """
+    Split text spans into sections and group articles under each section based on layout and patterns.
+    Handles cases where the section numeral and title are in separate spans.
     Returns a list of sections, each with a section_title and articles list.
     """
-    # Regex for section numeral (e.g., 'I.', 'II.', 'III.', 'I', 'II', etc.)
-    section_numeral_pattern = re.compile(r'^[IVX]+\.?\s*$')
-    # Article patterns as before
-    article_patterns = [
-        r'Article\s+(\d+)[:\s]*([^\n]*)',  # Article 1: Title
-        r'Art\.\s*(\d+)[:\s]*([^\n]*)',    # Art. 1: Title
-        r'§\s*(\d+)[:\s]*([^\n]*)',        # § 1: Title
-        r'Section\s+(\d+)[:\s]*([^\n]*)',  # Section 1: Title
-        r'(\d+)\.\s*([^\n]*)',             # 1. Title
-    ]
-    
     sections = []
     current_section = None
     current_article = None
-    current_title_blocks = []
-    current_content_blocks = []
-    column_separator = find_column_separator(blocks)
+    current_title_texts = []
+    current_content_texts = []
+    column_separator = find_column_separator(spans)
+    classes, matches = _classify_spans(spans)
+    # Left/right column membership for every span, one vectorized compare
+    is_left = spans.bbox[:, 0] < column_separator
+    num_spans = len(spans)
     i = 0
-    while i < len(blocks):
-        text = blocks[i]['text'].strip()
-        if not text:
+    while i < num_spans:
+        span_class = classes[i]
+        if span_class == SPAN_EMPTY:
             i += 1
             continue
+        text = spans.stripped[i]
         # Section numeral detection (standalone Roman numeral)
-        if section_numeral_pattern.match(text):
-            # Look ahead for the next non-empty block(s) to form the section title
+        if span_class == SPAN_NUMERAL:
+            # Look ahead for the next non-empty span(s) to form the section title
             numeral = text.rstrip('.')
             j = i + 1
             title_parts = []
-            while j < len(blocks):
-                next_text = blocks[j]['text'].strip()
+            while j < num_spans:
+                next_text = spans.stripped[j]
                 if next_text:
-                    # If the next block is also a single capital letter (e.g., 'A.'), treat as sub-section, not main section
-                    if re.match(r'^[A-Z]\.?$', next_text):
+                    # If the next span is also a single capital letter (e.g., 'A.'), treat as sub-section, not main section
+                    if SUBSECTION_RE.match(next_text):
                         title_parts.append(next_text.rstrip('.'))
                         j += 1
                         continue
@@ -142,13 +271,13 @@ def split_into_sections_and_articles_with_layout(blocks: List[Dict[str, Any]]) -
                 section_title += '. ' + ' '.join(title_parts)
             # Save previous article if exists
             if current_article:
-                current_article['article_title'] = ' '.join([b['text'] for b in current_title_blocks]).strip()
-                current_article['article_content'] = ' '.join([b['text'] for b in current_content_blocks]).strip()
+                current_article['article_title'] = ' '.join(current_title_texts).strip()
+                current_article['article_content'] = ' '.join(current_content_texts).strip()
                 if current_section:
                     current_section['articles'].append(current_article)
                 current_article = None
-                current_title_blocks = []
-                current_content_blocks = []
+                current_title_texts = []
+                current_content_texts = []
             # Save previous section if exists
             if current_section:
                 sections.append(current_section)
@@ -159,42 +288,40 @@ def split_into_sections_and_articles_with_layout(blocks: List[Dict[str, Any]]) -
             }
             i = j + 1
             continue
-        # Article detection
+        # Article detection (classification already ran the combined alternation)
         article_found = False
-        for pattern in article_patterns:
-            match = re.match(pattern, text, re.IGNORECASE)
-            if match:
-                # Save previous article if exists
-                if current_article:
-                    current_article['article_title'] = ' '.join([b['text'] for b in current_title_blocks]).strip()
-                    current_article['article_content'] = ' '.join([b['text'] for b in current_content_blocks]).strip()
-                    if current_section:
-                        current_section['articles'].append(current_article)
-                # Start new article
-                article_num = match.group(1)
-                title_text = match.group(2).strip() if len(match.groups()) > 1 else ""
-                current_article = {
-                    'article_number': article_num,
-                    'article_title': '',
-                    'article_content': ''
-                }
-                current_title_blocks = []
-                current_content_blocks = []
-                if title_text:
-                    current_title_blocks.append({'text': title_text})
-                article_found = True
-                break
-        # If not a new article, categorize block by position
+        if span_class == SPAN_ARTICLE:
+            match = matches[i]
+            # Save previous article if exists
+            if current_article:
+                current_article['article_title'] = ' '.join(current_title_texts).strip()
+                current_article['article_content'] = ' '.join(current_content_texts).strip()
+                if current_section:
+                    current_section['articles'].append(current_article)
+            # Start new article
+            article_num = match.group('num') or match.group('num2')
+            title_text = (match.group('title') if match.group('num') else match.group('title2') or '').strip()
+            current_article = {
+                'article_number': article_num,
+                'article_title': '',
+                'article_content': ''
+            }
+            current_title_texts = []
+            current_content_texts = []
+            if title_text:
+                current_title_texts.append(title_text)
+            article_found = True
+        # If not a new article, categorize span by position
         if not article_found and current_article:
-            if blocks[i]['bbox'][0] < column_separator:
-                current_title_blocks.append(blocks[i])
+            if is_left[i]:
+                current_title_texts.append(spans.text[i])
             else:
-                current_content_blocks.append(blocks[i])
+                current_content_texts.append(spans.text[i])
         i += 1
     # Save last article and section
     if current_article:
-        current_article['article_title'] = ' '.join([b['text'] for b in current_title_blocks]).strip()
-        current_article['article_content'] = ' '.join([b['text'] for b in current_content_blocks]).strip()
+        current_article['article_title'] = ' '.join(current_title_texts).strip()
+        current_article['article_content'] = ' '.join(current_content_texts).strip()
         if current_section:
             current_section['articles'].append(current_article)
     if current_section:
@@ -202,78 +329,186 @@ def split_into_sections_and_articles_with_layout(blocks: List[Dict[str, Any]]) -
     return sections
 
 
-def extract_metadata_from_blocks(blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+def _parse_date_match(match: 're.Match') -> str:
     """
-    Extract metadata from text blocks.
-    
+    Turn a DATE_RE match into a 'dd.mm.yyyy' string, dispatching on which
+    alternative matched. Returns '' if the matched text is not a valid date.
+    """
+    if match.group('dmy_d') is not None:  # dd/mm/yyyy or dd-mm-yyyy
+        d, m, y = match.group('dmy_d', 'dmy_m', 'dmy_y')
+        if len(y) == 2:
+            y = '20' + y if int(y) < 50 else '19' + y
+        d, m, y = int(d), int(m), int(y)
+    elif match.group('ymd_y') is not None:  # yyyy-mm-dd
+        y, m, d = match.group('ymd_y', 'ymd_m', 'ymd_d')
+        d, m, y = int(d), int(m), int(y)
+    elif match.group('en_month') is not None:  # English month
+        month, day, year = match.group('en_month', 'en_d', 'en_y')
+        d, m, y = int(day), MONTHS_EN.get(month.lower()), int(year)
+    elif match.group('de_month') is not None:  # German month
+        month, day, year = match.group('de_month', 'de_d', 'de_y')
+        d, m, y = int(day), MONTHS_DE.get(month.lower()), int(year)
+    else:  # 12. März 2023
+        day, month, year = match.group('de2_d', 'de2_month', 'de2_y')
+        d, m, y = int(day), MONTHS_DE.get(month.lower()), int(year)
+    # Validate ranges up front so malformed matches don't pay for an exception
+    if m is None or not (1 <= m <= 12 and 1 <= d <= 31 and 1 <= y <= 9999):
+        return ''
+    try:
+        return datetime.date(y, m, d).strftime('%d.%m.%Y')
+    except ValueError:  # day out of range for the month, e.g. 31.02.
+        return ''
+
+
+def extract_metadata_from_blocks(spans: Spans) -> Dict[str, Any]:
+    """
+    Extract metadata from text spans.
+
     Args:
-        blocks: List of text blocks with positioning information
-        
+        spans: Extracted text spans with positioning information
+
     Returns:
         Dictionary containing metadata
     """
-    import datetime
-    months_en = {m: i for i, m in enumerate(['January','February','March','April','May','June','July','August','September','October','November','December'], 1)}
-    months_de = {m: i for i, m in enumerate(['Januar','Februar','März','April','Mai','Juni','Juli','August','September','Oktober','November','Dezember'], 1)}
     metadata = {
         'title': '',
         'date': '',
     }
     
-    # Extract title from first few blocks (likely at top of page)
-    sorted_blocks = sorted(blocks, key=lambda x: (x['page'], x['bbox'][1], x['bbox'][0]))
-    
-    for block in sorted_blocks[:10]:
-        text = block['text'].strip()
+    # Extract title from first few spans (likely at top of page)
+    order = np.lexsort((spans.bbox[:, 0], spans.bbox[:, 1], spans.page)) if len(spans) else []
+
+    for idx in order[:10]:
+        text = spans.stripped[idx]
         if text and not metadata['title']:
             # Skip common headers/footers
             if not re.match(r'^(Page|Seite|©|Copyright)', text, re.IGNORECASE):
                 metadata['title'] = text[:200]  # Limit title length
                 break
-    
-    # Extract date patterns (including German months)
-    all_text = ' '.join([block['text'] for block in blocks])
-    date_patterns = [
-        r'\b(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})\b',
-        r'\b(\d{4})[/-](\d{1,2})[/-](\d{1,2})\b',
-        r'\b(January|February|March|April|May|June|July|August|September|October|November|December)\s+(\d{1,2}),?\s+(\d{4})\b',
-        r'\b(Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s+(\d{1,2}),?\s+(\d{4})\b',
-        r'\b(\d{1,2})\.\s*(Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s*(\d{4})\b',
-    ]
+
+    # Extract the first valid date, scanning each span once with the combined
+    # pattern instead of concatenating the whole document and re-scanning it
+    # once per format
     found_date = ''
-    for pattern in date_patterns:
-        match = re.search(pattern, all_text, re.IGNORECASE)
-        if match:
-            try:
-                if pattern == date_patterns[0]:  # dd/mm/yyyy or dd-mm-yyyy
-                    d, m, y = match.groups()
-                    if len(y) == 2:
-                        y = '20' + y if int(y) < 50 else '19' + y
-                    dt = datetime.date(int(y), int(m), int(d))
-                elif pattern == date_patterns[1]:  # yyyy-mm-dd
-                    y, m, d = match.groups()
-                    dt = datetime.date(int(y), int(m), int(d))
-                elif pattern == date_patterns[2]:  # English month
-                    month, day, year = match.groups()
-                    m = months_en[month.capitalize()]
-                    dt = datetime.date(int(year), m, int(day))
-                elif pattern == date_patterns[3]:  # German month
-                    month, day, year = match.groups()
-                    m = months_de[month.capitalize()]
-                    dt = datetime.date(int(year), m, int(day))
-                elif pattern == date_patterns[4]:  # 12. März 2023
-                    day, month, year = match.groups()
-                    m = months_de[month.capitalize()]
-                    dt = datetime.date(int(year), m, int(day))
-                found_date = dt.strftime('%d.%m.%Y')
+    for text in spans.text:
+        for match in DATE_RE.finditer(text):
+            found_date = _parse_date_match(match)
+            if found_date:
+                break
+        if found_date:
+            break
+    if not found_date:
+        # A date can be split across spans ('5. Dezember' | '2018'), so fall
+        # back to one scan over the joined text before giving up
+        joined = ' '.join(spans.text)
+        for match in DATE_RE.finditer(joined):
+            found_date = _parse_date_match(match)
+            if found_date:
                 break
-            except Exception:
-                continue
     metadata['date'] = found_date
-    
+
     return metadata
 
 
+def _is_cheap_article(text: str) -> bool:
+    """
+    True for articles not worth an LLM call: empty or very short content,
+    or pure transitional boilerplate ('Inkrafttreten am ...').
+    """
+    return (not text
+            or len(text) < MIN_ARTICLE_LENGTH_FOR_LLM
+            or bool(BOILERPLATE_ARTICLE_RE.match(text)))
+
+
+def _pack_article_batches(sections: List[Dict[str, Any]]) -> List[tuple]:
+    """
+    Greedily pack all LLM-worthy articles (across section boundaries) into
+    batches that stay under PROMPT_TOKEN_BUDGET and MAX_ARTICLES_PER_BATCH,
+    estimating ~4 characters per token. Packing by token budget instead of a
+    fixed article count amortizes the per-request network and prefill overhead
+    over as many articles as fit.
+    Cheap articles (see _is_cheap_article) are left out; the caller fills
+    their fields locally. Returns a list of (articles, article_texts) tuples
+    in document order.
+    """
+    batches = []
+    current_articles = []
+    current_texts = []
+    current_tokens = 0
+    for section in sections:
+        for article in section.get('articles', []):
+            text = article.get('article_content', '')
+            if _is_cheap_article(text):
+                continue
+            tokens = len(text) // 4
+            if current_articles and (current_tokens + tokens > PROMPT_TOKEN_BUDGET
+                                     or len(current_articles) >= MAX_ARTICLES_PER_BATCH):
+                batches.append((current_articles, current_texts))
+                current_articles = []
+                current_texts = []
+                current_tokens = 0
+            current_articles.append(article)
+            current_texts.append(text)
+            current_tokens += tokens
+    if current_articles:
+        batches.append((current_articles, current_texts))
+    return batches
+
+
+async def _extract_and_enhance(pdf_path: str) -> tuple:
+    """
+    Pipeline extraction and LLM enhancement inside one event loop: the
+    CPU-bound extraction runs in a thread while the HTTP connection to the
+    LLM provider is warmed up concurrently, then the whole-document call and
+    all article batch calls run concurrently over the same session, bounded
+    by a semaphore. The batch calls cannot start any earlier than this: the
+    column separator and the document-level prompt both need the full span
+    set before any section exists.
+    Returns:
+        Tuple of (metadata, sections, batches, document result dict,
+        list of batch result lists in batch order)
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+    async with aiohttp.ClientSession() as session:
+        warmup = asyncio.ensure_future(warm_connection(session))
+        spans = await asyncio.to_thread(extract_text_with_layout, pdf_path)
+        metadata = extract_metadata_from_blocks(spans)
+        sections = clean_section_article_text(split_into_sections_and_articles_with_layout(spans))
+        all_article_texts = []
+        cheap_count = 0
+        for section in sections:
+            for article in section.get('articles', []):
+                text = article.get('article_content', '')
+                all_article_texts.append(text)
+                # Short and boilerplate articles get local results, no API call
+                if _is_cheap_article(text):
+                    article['article_summary'] = text
+                    article['article_intention'] = ''
+                    article['article_keywords'] = ''
+                    cheap_count += 1
+        full_text = '\n'.join(all_article_texts)
+        # Pack the remaining articles into token-budgeted batches, across section boundaries
+        batches = _pack_article_batches(sections)
+        if cheap_count:
+            logger.info(f"Short-circuited {cheap_count} short/boilerplate articles without LLM calls")
+        logger.info(f"Enhancing document and {len(all_article_texts) - cheap_count} articles in {len(batches)} batches concurrently...")
+
+        async def run_document():
+            async with semaphore:
+                return await analyze_document_with_mistral_async(session, full_text)
+
+        async def run_batch(batch_texts):
+            async with semaphore:
+                return await analyze_articles_batch_with_mistral_async(session, batch_texts)
+
+        results = await asyncio.gather(
+            run_document(),
+            *[run_batch(batch_texts) for _, batch_texts in batches]
+        )
+        await warmup
+    return metadata, sections, batches, results[0], list(results[1:])
+
+
 def parse_pdf(pdf_path: str, enhance: bool = True) -> Dict[str, Any]:
     """
     Main function to parse a PDF and extract articles grouped by section using layout information.
@@ -284,41 +519,24 @@ def parse_pdf(pdf_path: str, enhance: bool = True) -> Dict[str, Any]:
         Dictionary containing parsed document structure with sections and grouped articles
     """
     logger.info(f"Parsing PDF with layout: {pdf_path}")
-    blocks = extract_text_with_layout(pdf_path)
-    metadata = extract_metadata_from_blocks(blocks)
-    sections = split_into_sections_and_articles_with_layout(blocks)
-    sections = clean_section_article_text(sections)
     document_summary = document_intention = document_keywords = None
     if enhance:
-        # Enhance the whole document first
-        all_article_texts = []
-        for section in sections:
-            for article in section.get('articles', []):
-                all_article_texts.append(article.get('article_content', ''))
-        full_text = '\n'.join(all_article_texts)
-        logger.info("Enhancing the document as a whole...")
-        doc_result = analyze_document_with_mistral(full_text)
+        # Extraction, enhancement and connection warmup share one event loop
+        metadata, sections, batches, doc_result, batch_results = asyncio.run(_extract_and_enhance(pdf_path))
         document_summary = doc_result.get('summary', '')
         document_intention = doc_result.get('intention', '')
         document_keywords = doc_result.get('keywords', '')
         document_title_enhanced = doc_result.get('title', '')
-        # Enhance articles section by section in batches of 5
-        for section_idx, section in enumerate(sections):
-            articles = section.get('articles', [])
-            if not articles:
-                continue
-            BATCH_SIZE = 5
-            for i in range(0, len(articles), BATCH_SIZE):
-                batch = articles[i:i+BATCH_SIZE]
-                batch_texts = [a.get('article_content', '') for a in batch]
-                logger.info(f"Enhancing articles {i+1}-{i+len(batch)} in section {section_idx+1}: {section.get('section_title', '')}")
-                llm_results = analyze_articles_batch_with_mistral(batch_texts)
-                for article, llm_result in zip(batch, llm_results):
-                    article['article_summary'] = llm_result.get('summary', '')
-                    article['article_intention'] = llm_result.get('intention', '')
-                    article['article_keywords'] = llm_result.get('keywords', '')
+        for (batch, _), llm_results in zip(batches, batch_results):
+            for article, llm_result in zip(batch, llm_results):
+                article['article_summary'] = llm_result.get('summary', '')
+                article['article_intention'] = llm_result.get('intention', '')
+                article['article_keywords'] = llm_result.get('keywords', '')
         logger.info(f"LLM enhancement complete for all articles and document.")
     else:
+        spans = extract_text_with_layout(pdf_path)
+        metadata = extract_metadata_from_blocks(spans)
+        sections = clean_section_article_text(split_into_sections_and_articles_with_layout(spans))
         logger.info("Skipping LLM enhancement (summaries, intentions, keywords)")
     # Build result dict with enhanced document fields before sections
     result = {}
@@ -345,7 +563,7 @@ def join_broken_words(text: str) -> str:
         return text
     # Remove hyphen at end of line followed by optional whitespace and a lowercase letter
     # Also handle cases where a hyphen is followed by a line break and then a capital letter
-    text = re.sub(r'-\s*\n?\s*([a-zA-ZäöüÄÖÜß])', r'\1', text)
+    text = HYPHEN_BREAK_RE.sub(r'\1', text)
     # Remove any remaining explicit line breaks
     text = text.replace('\n', ' ')
     return text
@@ -362,10 +580,9 @@ def remove_trailing_page_numbers(text: str) -> str:
     if not text:
         return text
     # Remove patterns like 'Seite 7', 'Page 7', or just a number at the end
-    text = re.sub(r'(Seite|Page)?\s*\d+\s*$', '', text, flags=re.IGNORECASE)
+    text = TRAILING_PAGE_RE.sub('', text)
     # Remove any extra whitespace
-    text = re.sub(r'\s+$', '', text)
-    return text
+    return text.rstrip()
 
 
 def remove_section_titles_from_title(title: str) -> str:
@@ -373,15 +590,14 @@ def remove_section_titles_from_title(title: str) -> str:
     Remove everything after the first section marker (e.g., 'A.', 'I.', 'II.', etc.) in the title.
     """
     # Pattern for section marker: Roman numerals or single capital letter, followed by dot
-    section_marker = re.search(r'(\s{0,2}(?:[IVX]+\.|[A-Z]\.)\s*)', title)
+    section_marker = SECTION_MARKER_RE.search(title)
     if section_marker:
         # Keep only the part before the first section marker
-        cleaned = title[:section_marker.start()].strip()
+        cleaned = title[:section_marker.start()]
     else:
-        cleaned = title.strip()
-    # Remove extra whitespace
-    cleaned = re.sub(r'\s+', ' ', cleaned)
-    return cleaned
+        cleaned = title
+    # Collapse whitespace in one C-level pass
+    return ' '.join(cleaned.split())
 
 
 def clean_section_article_text(sections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -390,19 +606,19 @@ def clean_section_article_text(sections: List[Dict[str, Any]]) -> List[Dict[str,
     """
     for section in sections:
         if 'section_title' in section:
-            section['section_title'] = re.sub(r'\s+', ' ', join_broken_words(section['section_title'])).strip()
+            section['section_title'] = ' '.join(join_broken_words(section['section_title']).split())
         for article in section.get('articles', []):
             if 'article_title' in article:
                 article['article_title'] = join_broken_words(article['article_title'])
                 article['article_title'] = remove_section_titles_from_title(article['article_title'])
-                article['article_title'] = re.sub(r'\s+', ' ', article['article_title']).strip()
+                article['article_title'] = ' '.join(article['article_title'].split())
             if 'article_content' in article:
                 content = article['article_content']
                 content = join_broken_words(content)
                 # Remove standalone page numbers (1-3 digits) with at least 4 spaces before and after, or at start/end
-                content = re.sub(r'(?:^|[ ]{4,})(\d{1,3})(?=[ ]{4,}|$)', '', content)
+                content = INLINE_PAGE_RE.sub('', content)
                 content = remove_trailing_page_numbers(content)
-                content = re.sub(r'\s+', ' ', content).strip()
+                content = ' '.join(content.split())
                 article['article_content'] = content
     return sections
 
@@ -410,7 +626,7 @@ def clean_section_article_text(sections: List[Dict[str, Any]]) -> List[Dict[str,
 if __name__ == "__main__":
     import argparse
     import os
-    import json
+    import orjson
     parser = argparse.ArgumentParser(description="Parse a PDF and extract articles (optionally with LLM enhancement)")
     parser.add_argument("pdf_path", type=str, help="Path to the PDF file")
     parser.add_argument("--no-enhance", action="store_true", help="Skip LLM enhancement (summaries, intentions, keywords)")
@@ -430,6 +646,6 @@ if __name__ == "__main__":
             print(f"Content preview: {article['article_content'][:100]}...")
     # Save result to JSON file
     json_path = os.path.splitext(args.pdf_path)[0] + ".json"
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    with open(json_path, "wb") as f:
+        f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
     print(f"\nFull result saved to {json_path}") 
\ No newline at end of file